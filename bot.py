@@ -1,9 +1,15 @@
 import time
+import atexit
+import csv
 import os
 import logging
 import sqlite3
 import asyncio
 import threading
+import queue
+import re
+from collections import defaultdict, deque
+from functools import lru_cache
 from telegram import (
     Update,
     InlineKeyboardButton,
@@ -20,7 +26,8 @@ from telegram.ext import (
     filters,
 )
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from datetime import datetime
 from flask import Flask, request
 
 # ───────────────────────────────────────
@@ -28,6 +35,7 @@ from flask import Flask, request
 # ───────────────────────────────────────
 DB_NAME = "users.db"
 REQUIRED_CHANNEL = "@rustycave"
+SUBSCRIBE_URL = f"https://t.me/{REQUIRED_CHANNEL.lstrip('@')}"
 STEAM_API_KEY = os.getenv("STEAM_API_KEY", "")
 
 # ID администратора – замените на свой
@@ -47,138 +55,379 @@ logger = logging.getLogger(__name__)
 # ───────────────────────────────────────
 #   СИСТЕМА ОГРАНИЧЕНИЯ ЗАПРОСОВ
 # ───────────────────────────────────────
+RATE_LIMIT_SLOTS = 8192  # степень двойки
+
 class RateLimiter:
-    def __init__(self):
-        self.requests = {}
-        self.last_cleanup = datetime.now()
+    # Фиксированная таблица слотов вместо растущего словаря: ключ
+    # (пользователь, действие) попадает в слот по хэшу, а при коллизии
+    # вытесняет прежнего владельца. Память ограничена, очистка не нужна.
+    # В слоте — корзина токенов: (ключ, остаток токенов, время последнего
+    # пополнения по time.monotonic()). Ёмкость — `limit`, за `period`
+    # секунд корзина наполняется полностью.
+    def __init__(self, slots=RATE_LIMIT_SLOTS):
+        self.mask = slots - 1
+        self.slots = [None] * slots
 
     def check_limit(self, user_id, action, limit=5, period=60):
-        now = datetime.now()
-        if (now - self.last_cleanup) > timedelta(minutes=10):
-            self.cleanup_old_requests()
-            self.last_cleanup = now
-
-        key = f"{user_id}_{action}"
-        self.requests.setdefault(key, [])
-        self.requests[key] = [t for t in self.requests[key] if now - t < timedelta(seconds=period)]
-
-        if len(self.requests[key]) >= limit:
+        now = time.monotonic()
+        key = (user_id, action)
+        idx = hash(key) & self.mask
+        slot = self.slots[idx]
+        if slot is None or slot[0] != key:
+            tokens = limit
+        else:
+            tokens = min(limit, slot[1] + (now - slot[2]) * limit / period)
+        if tokens < 1:
+            self.slots[idx] = (key, tokens, now)
             return False
-        self.requests[key].append(now)
+        self.slots[idx] = (key, tokens - 1, now)
         return True
 
-    def cleanup_old_requests(self):
-        now = datetime.now()
-        keys_to_remove = []
-        for key, timestamps in self.requests.items():
-            fresh = [t for t in timestamps if (now - t) < timedelta(hours=1)]
-            if fresh:
-                self.requests[key] = fresh
-            else:
-                keys_to_remove.append(key)
-        for key in keys_to_remove:
-            del self.requests[key]
-        logger.info(f"RateLimiter cleanup: removed {len(keys_to_remove)} old keys")
-
 limiter = RateLimiter()
 
 # ───────────────────────────────────────
 #   МЕНЕДЖЕР БАЗЫ ДАННЫХ
 # ───────────────────────────────────────
+# Одно пишущее соединение на весь процесс: не платим за connect/close на
+# каждый запрос и сохраняем кэш страниц SQLite между вызовами. Чтение идёт
+# через небольшой пул отдельных соединений: в режиме WAL читатели не ждут
+# писателя и друг друга.
+_CONN = None
+_DB_LOCK = threading.RLock()
+_db_depth = 0
+_db_owner = None
+
+READER_POOL_SIZE = 4
+_reader_pool = queue.Queue()
+_readers = []
+
+# BOT_PROFILE_SQL=1 включает замер времени каждого запроса: строки
+# (sql, duration_ns) пишутся фоновым потоком в database-perf-<ts>.csv.
+# Без переменной соединения открываются обычные — накладных расходов нет.
+PROFILE_SQL = os.getenv("BOT_PROFILE_SQL") == "1"
+_sql_profile_queue = queue.Queue()
+
+class _ProfiledCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter_ns()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _sql_profile_queue.put((sql, time.perf_counter_ns() - start))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter_ns()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _sql_profile_queue.put((sql, time.perf_counter_ns() - start))
+
+class _ProfiledConnection(sqlite3.Connection):
+    # Connection.execute в C обходит переопределённый Cursor.execute,
+    # поэтому запросы прямо на соединении тоже направляем через курсор.
+    def cursor(self, factory=_ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def _sql_profile_writer(path):
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("sql", "duration_ns"))
+        while True:
+            sql, ns = _sql_profile_queue.get()
+            writer.writerow((" ".join(sql.split()), ns))
+            if _sql_profile_queue.empty():
+                f.flush()
+
+if PROFILE_SQL:
+    _sql_profile_path = f"database-perf-{int(time.time())}.csv"
+    threading.Thread(
+        target=_sql_profile_writer, args=(_sql_profile_path,), daemon=True, name="sql-profile"
+    ).start()
+    logger.info(f"SQL profiling enabled: {_sql_profile_path}")
+
+def _open_connection(readonly=False):
+    # Читатели открывают файл в режиме mode=ro: запись через них невозможна
+    # на уровне SQLite, а не только по соглашению.
+    target = f"file:{DB_NAME}?mode=ro" if readonly else DB_NAME
+    conn = sqlite3.connect(
+        target, uri=readonly, check_same_thread=False, cached_statements=256, isolation_level=None,
+        factory=_ProfiledConnection if PROFILE_SQL else sqlite3.Connection,
+    )
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.create_function("bio_bonus", 1, bio_keyword_bonus, deterministic=True)
+    return conn
+
+def get_connection():
+    global _CONN
+    if _CONN is None:
+        with _DB_LOCK:
+            if _CONN is None:
+                conn = _open_connection()
+                conn.execute("PRAGMA journal_mode=WAL")
+                _CONN = conn
+    return _CONN
+
+def _get_reader():
+    if not _readers:
+        # Файл переводит в WAL пишущее соединение — открываем его первым.
+        get_connection()
+        with _DB_LOCK:
+            if not _readers:
+                for _ in range(READER_POOL_SIZE):
+                    conn = _open_connection(readonly=True)
+                    _readers.append(conn)
+                    _reader_pool.put(conn)
+    return _reader_pool.get()
+
 class Database:
+    # Соединение работает в режиме autocommit (isolation_level=None), а
+    # транзакцию явно открывают только пишущие блоки — чтение идёт без
+    # BEGIN/COMMIT. Вложенные блоки (одна @safe_db_execute-функция вызывает
+    # другую) работают в одной транзакции: коммит выполняет самый внешний блок.
+    def __init__(self, write=True):
+        self.write = write
+
     def __enter__(self):
-        self.conn = sqlite3.connect(DB_NAME)
-        return self.conn.cursor()
+        global _db_depth, _db_owner
+        self.conn = get_connection()
+        _DB_LOCK.acquire()
+        _db_depth += 1
+        _db_owner = threading.get_ident()
+        try:
+            if self.write and not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+        except sqlite3.Error:
+            _db_depth -= 1
+            if _db_depth == 0:
+                _db_owner = None
+            _DB_LOCK.release()
+            raise
+        self.cursor = self.conn.cursor()
+        return self.cursor
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        global _db_depth, _db_owner
         try:
-            self.conn.commit()
-        except:
+            _db_depth -= 1
+            if _db_depth == 0:
+                _db_owner = None
+                if self.conn.in_transaction:
+                    if exc_type is None:
+                        self.conn.commit()
+                    else:
+                        self.conn.rollback()
+        except sqlite3.Error:
+            # Неудачный COMMIT откатываем и пробрасываем дальше: иначе
+            # вызывающий код решит, что запись прошла.
             self.conn.rollback()
+            raise
         finally:
-            self.conn.close()
+            self.cursor.close()
+            if _db_depth == 0:
+                # Транзакция закрыта — теперь сброс кэшей виден читателям.
+                _publish_invalidations()
+            _DB_LOCK.release()
+
+class ReadDatabase:
+    # Блок только для чтения на соединении из пула. Если поток уже внутри
+    # Database(), читаем через пишущее соединение — иначе не увидим
+    # собственных незакоммиченных изменений.
+    def __enter__(self):
+        if _db_owner == threading.get_ident():
+            self.inner = Database(write=False)
+            return self.inner.__enter__()
+        self.inner = None
+        self.conn = _get_reader()
+        self.cursor = self.conn.cursor()
+        return self.cursor
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.inner is not None:
+            return self.inner.__exit__(exc_type, exc_val, exc_tb)
+        self.cursor.close()
+        _reader_pool.put(self.conn)
 
 # ───────────────────────────────────────
 #   БАЗА ДАННЫХ
 # ───────────────────────────────────────
+# Схема создаётся одним скриптом в одной транзакции. PRAGMA задаются
+# в get_connection(): они действуют на соединение, а не на файл.
+SCHEMA_SQL = """
+BEGIN;
+CREATE TABLE IF NOT EXISTS users (
+    telegram_id INTEGER PRIMARY KEY,
+    name TEXT,
+    hours INTEGER,
+    age INTEGER,
+    bio TEXT,
+    username TEXT,
+    is_active INTEGER DEFAULT 1,
+    is_verified INTEGER DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS stats (
+    user_id INTEGER PRIMARY KEY,
+    viewed_profiles INTEGER DEFAULT 0,
+    likes_given INTEGER DEFAULT 0,
+    matches INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS likes (
+    from_id INTEGER,
+    to_id INTEGER,
+    PRIMARY KEY (from_id, to_id)
+);
+CREATE TABLE IF NOT EXISTS seen (
+    from_id INTEGER,
+    to_id INTEGER,
+    PRIMARY KEY (from_id, to_id)
+);
+CREATE TABLE IF NOT EXISTS pending_likes (
+    from_id INTEGER,
+    to_id INTEGER,
+    from_name TEXT,
+    PRIMARY KEY (from_id, to_id)
+);
+CREATE TABLE IF NOT EXISTS reports (
+    reporter_id INTEGER,
+    reported_id INTEGER,
+    reported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(reporter_id, reported_id)
+);
+CREATE TABLE IF NOT EXISTS temp_bans (
+    user_id INTEGER PRIMARY KEY,
+    banned_until INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_users_hours_age ON users(hours, age);
+CREATE INDEX IF NOT EXISTS idx_pending_to ON pending_likes(to_id);
+CREATE INDEX IF NOT EXISTS idx_reports_reported ON reports(reported_id);
+COMMIT;
+"""
+
 def init_db() -> None:
-    with Database() as cur:
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                telegram_id INTEGER PRIMARY KEY,
-                name TEXT,
-                hours INTEGER,
-                age INTEGER,
-                bio TEXT,
-                username TEXT,
-                is_active INTEGER DEFAULT 1,
-                is_verified INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS stats (
-                user_id INTEGER PRIMARY KEY,
-                viewed_profiles INTEGER DEFAULT 0,
-                likes_given INTEGER DEFAULT 0,
-                matches INTEGER DEFAULT 0
-            )
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS likes (
-                from_id INTEGER,
-                to_id INTEGER,
-                PRIMARY KEY (from_id, to_id)
-            )
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS pending_likes (
-                from_id INTEGER,
-                to_id INTEGER,
-                from_name TEXT,
-                PRIMARY KEY (from_id, to_id)
-            )
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS reports (
-                reporter_id INTEGER,
-                reported_id INTEGER,
-                reported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(reporter_id, reported_id)
-            )
-            """
-        )
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS temp_bans (
-                user_id INTEGER PRIMARY KEY,
-                banned_until TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
+    # Скрипт сам открывает и закрывает транзакцию.
+    with Database(write=False) as cur:
+        cur.executescript(SCHEMA_SQL)
+        # Статистика для планировщика: без неё SQLite выбирает индексы
+        # вслепую. analysis_limit ограничивает время ANALYZE на большой базе.
+        cur.execute("PRAGMA analysis_limit=400")
+        cur.execute("ANALYZE")
+    _migrate_ban_timestamps()
+
+# ───────────────────────────────────────
+#   SQL-ЗАПРОСЫ
+# ───────────────────────────────────────
+# Горячие запросы вынесены в константы: sqlite3 кэширует подготовленные
+# выражения по тексту SQL (до cached_statements штук на соединение), а
+# соединение у нас одно на весь процесс.
+# Upsert вместо INSERT OR REPLACE: существующая строка обновляется на месте
+# (created_at сохраняется, индексы переписываются только по изменённым
+# столбцам), а если анкета не изменилась, запись не выполняется вовсе.
+_SQL_SAVE_USER = """
+INSERT INTO users
+(telegram_id, name, hours, age, bio, username, is_active, is_verified)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (telegram_id) DO UPDATE SET
+    name = excluded.name,
+    hours = excluded.hours,
+    age = excluded.age,
+    bio = excluded.bio,
+    username = excluded.username,
+    is_active = excluded.is_active,
+    is_verified = excluded.is_verified
+WHERE (name, hours, age, bio, username, is_active, is_verified)
+    IS NOT (excluded.name, excluded.hours, excluded.age, excluded.bio,
+            excluded.username, excluded.is_active, excluded.is_verified)
+"""
+
+_SQL_GET_PROFILE = """
+SELECT name, hours, age, bio, username, is_active, is_verified
+FROM users
+WHERE telegram_id = ?
+"""
+
+# Уже лайкнутые и отклонённые анкеты отсекаются анти-джойном, забаненные —
+# NOT EXISTS по первичному ключу temp_bans.
+_SQL_RANKED_PARTNERS = """
+SELECT u.telegram_id, u.name, u.hours, u.age, u.bio, u.username, u.is_verified
+FROM users u
+LEFT JOIN likes l ON l.from_id = ? AND l.to_id = u.telegram_id
+LEFT JOIN seen s ON s.from_id = ? AND s.to_id = u.telegram_id
+WHERE u.telegram_id != ?
+  AND u.is_active = 1
+  AND NOT EXISTS (
+      SELECT 1 FROM temp_bans b
+      WHERE b.user_id = u.telegram_id AND b.banned_until >= ?
+  )
+  AND l.to_id IS NULL
+  AND s.to_id IS NULL
+ORDER BY abs(u.hours - ?) * 0.5 + abs(u.age - ?) * 0.5
+         + CASE WHEN u.is_verified THEN -20 ELSE 0 END
+         + bio_bonus(u.bio),
+         u.telegram_id
+LIMIT ?
+"""
+
+# Вставка и проверка встречного лайка — одна инструкция. DO UPDATE вместо
+# IGNORE нужен, чтобы RETURNING отдавал строку и при повторном лайке.
+_SQL_ADD_LIKE = """
+INSERT INTO likes (from_id, to_id) VALUES (?, ?)
+ON CONFLICT (from_id, to_id) DO UPDATE SET to_id = excluded.to_id
+RETURNING EXISTS (SELECT 1 FROM likes WHERE from_id = ? AND to_id = ?)
+"""
+
+_SQL_INC_MATCHES = """
+INSERT INTO stats (user_id, matches) VALUES (?, 1)
+ON CONFLICT (user_id) DO UPDATE SET matches = matches + 1
+"""
+
+_SQL_ADD_SEEN = "INSERT OR IGNORE INTO seen (from_id, to_id) VALUES (?, ?)"
+
+_SQL_ADD_PENDING_LIKE = "INSERT OR REPLACE INTO pending_likes (from_id, to_id, from_name) VALUES (?, ?, ?)"
+
+_SQL_GET_PENDING_LIKES = "SELECT from_id, from_name FROM pending_likes WHERE to_id = ?"
+
+_SQL_REMOVE_PENDING_LIKE = "DELETE FROM pending_likes WHERE from_id = ? AND to_id = ?"
+
+# Счётчики статистики в порядке столбцов _SQL_GET_STATS.
+STAT_FIELDS = ("viewed_profiles", "likes_given", "matches")
+ALLOWED_STAT_FIELDS = frozenset(STAT_FIELDS)
+
+_SQL_GET_STATS = "SELECT viewed_profiles, likes_given, matches FROM stats WHERE user_id = ?"
+
+# Текст upsert'а для каждого счётчика собирается один раз, а не при каждом сбросе.
+_SQL_STAT_UPSERT = {
+    field: f"INSERT INTO stats (user_id, {field}) VALUES (?, ?) "
+           f"ON CONFLICT (user_id) DO UPDATE SET {field} = {field} + excluded.{field}"
+    for field in STAT_FIELDS
+}
+
+_SQL_SET_VERIFIED_HOURS = "UPDATE users SET hours = ?, is_verified = 1 WHERE telegram_id = ?"
 
 # ───────────────────────────────────────
 #   ВАЛИДАЦИЯ
 # ───────────────────────────────────────
+_STEAM_ID_LOW = 76561197960265728
+_STEAM_ID_HIGH = _STEAM_ID_LOW + (1 << 32)
+
 def validate_steam_id(steam_id):
-    try:
-        if isinstance(steam_id, str):
-            if not steam_id.isdigit():
-                return False
-            steam_id = int(steam_id)
-        return 76561197960265728 <= steam_id <= 76561197960265728 + 2**32
-    except (ValueError, TypeError):
-        return False
+    if isinstance(steam_id, str):
+        steam_id = parse_int(steam_id)
+    return isinstance(steam_id, int) and _STEAM_ID_LOW <= steam_id <= _STEAM_ID_HIGH
+
+def parse_int(text):
+    """Неотрицательное целое из ввода пользователя или None."""
+    # isascii() отсекает «цифры» вроде «²», на которых int() падает.
+    return int(text) if text.isascii() and text.isdigit() else None
 
 def validate_hours(hours):
     return isinstance(hours, int) and 0 <= hours <= 20000
@@ -192,10 +441,10 @@ def validate_bio(bio):
 # ───────────────────────────────────────
 #   ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ───────────────────────────────────────
-def safe_db_execute(func):
+def _db_call(func, write):
     def wrapper(*args, **kwargs):
         try:
-            with Database() as cur:
+            with (Database() if write else ReadDatabase()) as cur:
                 return func(cur, *args, **kwargs)
         except sqlite3.Error as e:
             logger.error(f"Database error in {func.__name__}: {e}")
@@ -205,85 +454,227 @@ def safe_db_execute(func):
             return None
     return wrapper
 
-@safe_db_execute
-def save_user(cur, tg_id, name, hours, age, bio, username, is_active=1, is_verified=0):
-    cur.execute(
-        """
-        INSERT OR REPLACE INTO users
-        (telegram_id, name, hours, age, bio, username, is_active, is_verified)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (tg_id, name, hours, age, bio, username, is_active, is_verified),
-    )
+def safe_db_execute(func):
+    return _db_call(func, write=True)
+
+def safe_db_read(func):
+    # Для функций, которые только читают: соединение из пула читателей.
+    return _db_call(func, write=False)
+
+async def run_db(func, *args, **kwargs):
+    # Синхронные запросы к SQLite выполняем в пуле потоков, чтобы не
+    # блокировать цикл событий, пока другие пользователи жмут кнопки.
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+# Растёт после каждого коммита, менявшего users или temp_bans; по нему
+# find_partner понимает, что сохранённая в сессии выдача могла устареть.
+_users_version = 0
 
 @safe_db_execute
-def get_user_profile(cur, tg_id):
+def save_users(cur, rows):
+    """Пакетная запись анкет: rows — кортежи (tg_id, name, hours, age, bio, username, is_active, is_verified).
+
+    Любую массовую загрузку анкет делать через неё: одна транзакция на пачку.
+    """
+    cur.executemany(_SQL_SAVE_USER, rows)
+    for row in rows:
+        invalidate_profile(row[0])
+    # safe_db_execute возвращает None при ошибке — по True видно, что пачка записана.
+    return True
+
+# Групповой коммит анкет: save_user ставит строку в очередь и ждёт, пока
+# фоновый поток запишет её вместе с соседними одной транзакцией.
+SAVE_BATCH_SIZE = 50
+SAVE_TIMEOUT = 30
+_save_queue = queue.Queue()
+_save_writer = None
+_save_writer_lock = threading.Lock()
+
+def _save_writer_loop():
+    while True:
+        batch = [_save_queue.get()]
+        while len(batch) < SAVE_BATCH_SIZE:
+            try:
+                batch.append(_save_queue.get_nowait())
+            except queue.Empty:
+                break
+        # Поток не должен умирать из-за одной пачки: иначе все следующие
+        # save_user ждали бы ответа впустую.
+        try:
+            ok = save_users([row for row, _ in batch]) is True
+        except Exception as e:
+            logger.error(f"Unexpected error in user writer: {e}")
+            ok = False
+        for _, reply in batch:
+            reply.put(ok)
+
+def save_user(tg_id, name, hours, age, bio, username, is_active=1, is_verified=0):
+    """Записывает анкету через групповой коммит; True, если она сохранена."""
+    global _save_writer
+    if _save_writer is None or not _save_writer.is_alive():
+        with _save_writer_lock:
+            if _save_writer is None or not _save_writer.is_alive():
+                _save_writer = threading.Thread(target=_save_writer_loop, name="user-writer", daemon=True)
+                _save_writer.start()
+    reply = queue.Queue(maxsize=1)
+    _save_queue.put(((tg_id, name, hours, age, bio, username, is_active, is_verified), reply))
+    try:
+        return reply.get(timeout=SAVE_TIMEOUT)
+    except queue.Empty:
+        logger.error(f"Timed out saving profile of user {tg_id}")
+        return False
+
+# Кэш анкет: tg_id → (время загрузки, строка). Сбрасывается при любой
+# записи в users, так что TTL лишь страхует от устаревших данных.
+PROFILE_CACHE_TTL = 60
+PROFILE_CACHE_MAX = 4096
+_profile_cache = {}
+# Растёт при каждой инвалидации и ещё раз после коммита. Читатель снимает
+# эпоху до запроса и кладёт строку в кэш, только если она не изменилась.
+_profile_epoch = 0
+# Отдельная короткая блокировка для эпохи и словаря. Под ней никогда не
+# ждём ни _DB_LOCK, ни соединения из пула — иначе читатели и писатель
+# могут заблокировать друг друга.
+_profile_lock = threading.Lock()
+# ID, сброшенные в открытой транзакции: после коммита сбрасываем их ещё
+# раз, на случай если читатель успел закэшировать старую строку.
+_pending_profile_ids = set()
+
+def _cache_profiles(rows, epoch):
+    # Словарь хранит порядок вставки, поэтому первой вытесняется запись,
+    # которая дольше всех не обновлялась.
+    now = time.monotonic()
+    with _profile_lock:
+        if epoch != _profile_epoch:
+            return
+        for tg_id, row in rows:
+            _profile_cache.pop(tg_id, None)
+            _profile_cache[tg_id] = (now, row)
+        while len(_profile_cache) > PROFILE_CACHE_MAX:
+            del _profile_cache[next(iter(_profile_cache))]
+
+def invalidate_profile(tg_id):
+    # Вызывается внутри пишущего блока, под _DB_LOCK.
+    global _profile_epoch
+    with _profile_lock:
+        _profile_epoch += 1
+        _profile_cache.pop(tg_id, None)
+    _pending_profile_ids.add(tg_id)
+
+def _publish_invalidations():
+    # Вызывается Database после COMMIT/ROLLBACK внешнего блока, под _DB_LOCK.
+    global _profile_epoch, _blocked_dirty, _users_version
+    if _pending_profile_ids or _blocked_dirty:
+        _users_version += 1
+    if _pending_profile_ids:
+        with _profile_lock:
+            _profile_epoch += 1
+            for tg_id in _pending_profile_ids:
+                _profile_cache.pop(tg_id, None)
+        _pending_profile_ids.clear()
+    if _blocked_dirty:
+        _reset_blocked()
+        _blocked_dirty = False
+
+@safe_db_read
+def _load_user_profile(cur, tg_id):
+    cur.execute(_SQL_GET_PROFILE, (tg_id,))
+    return cur.fetchone()
+
+def get_user_profile(tg_id):
+    cached = _profile_cache.get(tg_id)
+    if cached and time.monotonic() - cached[0] < PROFILE_CACHE_TTL:
+        return cached[1]
+    # Эпоху снимаем до запроса, а сверяем уже после возврата соединения в пул.
+    epoch = _profile_epoch
+    row = _load_user_profile(tg_id)
+    if row is not None:
+        _cache_profiles([(tg_id, row)], epoch)
+    return row
+
+@safe_db_read
+def _load_user_profiles(cur, tg_ids):
+    placeholders = ",".join("?" * len(tg_ids))
     cur.execute(
-        """
-        SELECT name, hours, age, bio, username, is_active, is_verified
+        f"""
+        SELECT telegram_id, name, hours, age, bio, username, is_active, is_verified
         FROM users
-        WHERE telegram_id = ?
+        WHERE telegram_id IN ({placeholders})
         """,
-        (tg_id,),
+        tuple(tg_ids),
     )
-    return cur.fetchone()
+    return {tg_id: tuple(row) for tg_id, *row in cur.fetchall()}
+
+def get_user_profiles(tg_ids):
+    """Анкеты нескольких пользователей одним запросом: {tg_id: строка}."""
+    now = time.monotonic()
+    profiles = {}
+    missing = []
+    for tg_id in dict.fromkeys(tg_ids):
+        cached = _profile_cache.get(tg_id)
+        if cached and now - cached[0] < PROFILE_CACHE_TTL:
+            profiles[tg_id] = cached[1]
+        else:
+            missing.append(tg_id)
+    if missing:
+        epoch = _profile_epoch
+        loaded = _load_user_profiles(missing) or {}
+        _cache_profiles(loaded.items(), epoch)
+        profiles.update(loaded)
+    return profiles
+
+def get_user_profile_full(tg_id):
+    """Анкета в формате карточки напарника: (tg_id, name, hours, age, bio, username, is_verified)."""
+    profile = get_user_profile(tg_id)
+    if profile is None:
+        return None
+    name, hours, age, bio, username, _, is_verified = profile
+    return tg_id, name, hours, age, bio, username, is_verified
 
 def has_profile(user_id: int) -> bool:
     return get_user_profile(user_id) is not None
 
-@safe_db_execute
-def get_all_active_partners(cur, exclude_id):
+@safe_db_read
+def get_ranked_partners(cur, exclude_id, cur_hours, cur_age, limit=50):
+    # Ранжирование выполняет SQLite: в Python приходят только лучшие
+    # `limit` анкет, уже отсортированные по близости.
     cur.execute(
-        """
-        SELECT u.telegram_id, u.name, u.hours, u.age, u.bio, u.username, u.is_verified
-        FROM users u
-        LEFT JOIN temp_bans b ON u.telegram_id = b.user_id
-        WHERE u.telegram_id != ?
-          AND u.is_active = 1
-          AND (b.banned_until IS NULL OR b.banned_until < ?)
-        """,
-        (exclude_id, datetime.now().isoformat()),
+        _SQL_RANKED_PARTNERS,
+        (exclude_id, exclude_id, exclude_id, int(time.time()), cur_hours, cur_age, limit),
     )
     return cur.fetchall()
 
-def is_profile_complete(tg_id):
-    return get_user_profile(tg_id) is not None
-
 @safe_db_execute
 def add_like(cur, from_id, to_id):
-    cur.execute(
-        "INSERT OR IGNORE INTO likes (from_id, to_id) VALUES (?, ?)",
-        (from_id, to_id),
-    )
-    cur.execute(
-        "SELECT 1 FROM likes WHERE from_id = ? AND to_id = ?", (to_id, from_id)
-    )
-    match = cur.fetchone() is not None
+    cur.execute(_SQL_ADD_LIKE, (from_id, to_id, to_id, from_id))
+    match = bool(cur.fetchone()[0])
     if match:
-        update_stat(from_id, "matches")
-        update_stat(to_id, "matches")
+        # Счётчики матчей обновляем здесь же, без вложенных вызовов update_stat.
+        cur.executemany(_SQL_INC_MATCHES, [(from_id,), (to_id,)])
     logger.info(f"Like added: {from_id} → {to_id}, match: {match}")
     return match
 
 @safe_db_execute
-def add_pending_like(cur, from_id, to_id, from_name):
-    cur.execute(
-        "INSERT OR REPLACE INTO pending_likes (from_id, to_id, from_name) VALUES (?, ?, ?)",
-        (from_id, to_id, from_name),
-    )
+def add_likes(cur, pairs):
+    """Пакетная вставка лайков для импорта и миграций: pairs — кортежи (from_id, to_id). Счётчики матчей не меняет."""
+    cur.executemany("INSERT OR IGNORE INTO likes (from_id, to_id) VALUES (?, ?)", pairs)
+
+@safe_db_execute
+def add_seen(cur, from_id, to_id):
+    cur.execute(_SQL_ADD_SEEN, (from_id, to_id))
 
 @safe_db_execute
+def add_pending_like(cur, from_id, to_id, from_name):
+    cur.execute(_SQL_ADD_PENDING_LIKE, (from_id, to_id, from_name))
+
+@safe_db_read
 def get_pending_likes(cur, to_id):
-    cur.execute(
-        "SELECT from_id, from_name FROM pending_likes WHERE to_id = ?", (to_id,)
-    )
+    cur.execute(_SQL_GET_PENDING_LIKES, (to_id,))
     return cur.fetchall()
 
 @safe_db_execute
 def remove_pending_like(cur, from_id, to_id):
-    cur.execute(
-        "DELETE FROM pending_likes WHERE from_id = ? AND to_id = ?", (from_id, to_id)
-    )
+    cur.execute(_SQL_REMOVE_PENDING_LIKE, (from_id, to_id))
 
 @safe_db_execute
 def add_report(cur, reporter_id, reported_id):
@@ -296,47 +687,136 @@ def add_report(cur, reporter_id, reported_id):
 @safe_db_execute
 def deactivate_user(cur, tg_id):
     cur.execute("UPDATE users SET is_active = 0 WHERE telegram_id = ?", (tg_id,))
+    invalidate_profile(tg_id)
 
 @safe_db_execute
 def activate_user(cur, tg_id):
     cur.execute("UPDATE users SET is_active = 1 WHERE telegram_id = ?", (tg_id,))
+    invalidate_profile(tg_id)
 
 @safe_db_execute
-def ban_user_temporarily(cur, user_id, days=5):
-    banned_until = datetime.now() + timedelta(days=days)
-    cur.execute(
+def _migrate_ban_timestamps(cur):
+    # Раньше banned_until хранился ISO-строкой локального времени; теперь —
+    # целым unix-временем. Старые строки переводим один раз при запуске.
+    cur.execute("SELECT user_id, banned_until FROM temp_bans WHERE typeof(banned_until) = 'text'")
+    rows = cur.fetchall()
+    if rows:
+        cur.executemany(
+            "UPDATE temp_bans SET banned_until = ? WHERE user_id = ?",
+            [(int(datetime.fromisoformat(until).timestamp()), user_id) for user_id, until in rows],
+        )
+        invalidate_blocked()
+        logger.info(f"Migrated {len(rows)} ban timestamps to unix time")
+
+@safe_db_execute
+def bulk_ban_users(cur, user_ids, days=5, clear_reports=False):
+    """Бан списка пользователей одной транзакцией; возвращает срок бана (unix-время)."""
+    banned_until = int(time.time()) + days * 86400
+    cur.executemany(
         "INSERT OR REPLACE INTO temp_bans (user_id, banned_until) VALUES (?, ?)",
-        (user_id, banned_until.isoformat()),
+        [(user_id, banned_until) for user_id in user_ids],
     )
-    deactivate_user(user_id)
-    logger.warning(f"User {user_id} banned for {days} days")
+    cur.executemany(
+        "UPDATE users SET is_active = 0 WHERE telegram_id = ?",
+        [(user_id,) for user_id in user_ids],
+    )
+    if clear_reports:
+        # Тем же курсором: ошибка откатит и сам бан.
+        _delete_reports(cur, user_ids)
+    for user_id in user_ids:
+        invalidate_profile(user_id)
+    invalidate_blocked()
+    logger.warning(f"Users {list(user_ids)} banned for {days} days")
+    return banned_until
 
 @safe_db_execute
-def unban_user(cur, user_id):
-    cur.execute("DELETE FROM temp_bans WHERE user_id = ?", (user_id,))
-    activate_user(user_id)
+def bulk_unban_users(cur, user_ids):
+    """Снятие бана со списка пользователей одной транзакцией."""
+    cur.executemany(
+        "DELETE FROM temp_bans WHERE user_id = ?", [(user_id,) for user_id in user_ids]
+    )
+    cur.executemany(
+        "UPDATE users SET is_active = 1 WHERE telegram_id = ?",
+        [(user_id,) for user_id in user_ids],
+    )
+    for user_id in user_ids:
+        invalidate_profile(user_id)
+    invalidate_blocked()
 
-@safe_db_execute
-def is_user_banned(cur, user_id):
+def ban_user_temporarily(user_id, days=5, clear_reports=False):
+    return bulk_ban_users([user_id], days, clear_reports)
+
+def unban_user(user_id):
+    bulk_unban_users([user_id])
+
+@safe_db_read
+def get_blocked_list(cur):
     cur.execute(
-        "SELECT banned_until FROM temp_bans WHERE user_id = ? AND banned_until > ?",
-        (user_id, datetime.now().isoformat()),
+        "SELECT user_id, banned_until FROM temp_bans WHERE banned_until > ?",
+        (int(time.time()),),
     )
-    return cur.fetchone() is not None
+    return cur.fetchall()
 
-@safe_db_execute
-def get_banned_until(cur, user_id):
-    cur.execute(
-        "SELECT banned_until FROM temp_bans WHERE user_id = ?", (user_id,)
+# Активные баны {user_id: banned_until}, загруженные одним запросом. Проверка
+# бана идёт на каждом апдейте, поэтому вместо SELECT — поиск в словаре.
+# Сбрасывается при бане/разбане; истёкшие записи отсекаются при проверке.
+_blocked_cache = None
+# Загрузка идёт без _DB_LOCK; готовый словарь подставляется, только если за
+# это время версия не сменилась. Версия растёт при бане/разбане и ещё раз
+# после коммита — как эпоха кэша анкет.
+_blocked_version = 0
+_blocked_lock = threading.Lock()
+_blocked_dirty = False
+
+def cached_blocked():
+    global _blocked_cache
+    blocked = _blocked_cache
+    if blocked is not None:
+        return blocked
+    version = _blocked_version
+    rows = get_blocked_list()
+    if rows is None:
+        return {}
+    blocked = dict(rows)
+    with _blocked_lock:
+        if version == _blocked_version:
+            _blocked_cache = blocked
+    return blocked
+
+def _reset_blocked():
+    global _blocked_cache, _blocked_version
+    with _blocked_lock:
+        _blocked_version += 1
+        _blocked_cache = None
+
+def invalidate_blocked():
+    # Вызывается внутри пишущего блока, под _DB_LOCK.
+    global _blocked_dirty
+    _reset_blocked()
+    _blocked_dirty = True
+
+def get_active_ban(user_id, blocked=None):
+    """Срок действующего бана (unix-время) или None."""
+    if blocked is None:
+        blocked = cached_blocked()
+    banned_until = blocked.get(user_id)
+    if banned_until is not None and banned_until > time.time():
+        return banned_until
+    return None
+
+def _delete_reports(cur, user_ids):
+    cur.executemany(
+        "DELETE FROM reports WHERE reported_id = ?", [(user_id,) for user_id in user_ids]
     )
-    row = cur.fetchone()
-    return row[0] if row else None
 
 @safe_db_execute
-def clear_reports_for(cur, user_id):
-    cur.execute("DELETE FROM reports WHERE reported_id = ?", (user_id,))
+def bulk_clear_reports(cur, user_ids):
+    _delete_reports(cur, user_ids)
 
-@safe_db_execute
+def clear_reports_for(user_id):
+    bulk_clear_reports([user_id])
+
+@safe_db_read
 def get_reports_summary(cur):
     cur.execute(
         """
@@ -349,61 +829,111 @@ def get_reports_summary(cur):
     )
     return cur.fetchall()
 
-@safe_db_execute
-def update_stat(cur, user_id, field):
-    allowed_fields = ["viewed_profiles", "likes_given", "matches"]
-    if field not in allowed_fields:
+# Счётчики статистики копятся в памяти и сбрасываются в базу пачкой раз в
+# STATS_FLUSH_INTERVAL секунд вместо UPDATE на каждое событие.
+STATS_FLUSH_INTERVAL = 5
+_stat_deltas = defaultdict(int)
+_stat_lock = threading.Lock()
+_stats_flusher = None
+
+def update_stat(user_id, field):
+    if field not in ALLOWED_STAT_FIELDS:
         logger.error(f"Invalid field: {field}")
         return
-    cur.execute("INSERT OR IGNORE INTO stats (user_id) VALUES (?)", (user_id,))
-    if field == "viewed_profiles":
-        cur.execute("UPDATE stats SET viewed_profiles = viewed_profiles + 1 WHERE user_id = ?", (user_id,))
-    elif field == "likes_given":
-        cur.execute("UPDATE stats SET likes_given = likes_given + 1 WHERE user_id = ?", (user_id,))
-    elif field == "matches":
-        cur.execute("UPDATE stats SET matches = matches + 1 WHERE user_id = ?", (user_id,))
+    global _stats_flusher
+    with _stat_lock:
+        _stat_deltas[(user_id, field)] += 1
+        if _stats_flusher is None:
+            _stats_flusher = threading.Thread(target=_stats_flusher_loop, name="stats-flusher", daemon=True)
+            _stats_flusher.start()
 
 @safe_db_execute
-def get_stats(cur, user_id):
-    cur.execute(
-        "SELECT viewed_profiles, likes_given, matches FROM stats WHERE user_id = ?",
-        (user_id,),
-    )
-    result = cur.fetchone()
-    return result or (0, 0, 0)
+def _write_stat_deltas(cur, deltas):
+    # Одна инструкция на строку: вставка новой записи или прибавка к существующей.
+    for field, sql in _SQL_STAT_UPSERT.items():
+        rows = [(user_id, n) for (user_id, f), n in deltas.items() if f == field]
+        if rows:
+            cur.executemany(sql, rows)
+    return True
+
+def flush_stats():
+    with _stat_lock:
+        deltas = dict(_stat_deltas)
+        _stat_deltas.clear()
+    if deltas and not _write_stat_deltas(deltas):
+        # Запись не удалась — возвращаем приращения, попробуем в следующий раз.
+        with _stat_lock:
+            for key, n in deltas.items():
+                _stat_deltas[key] += n
+
+def _stats_flusher_loop():
+    while True:
+        time.sleep(STATS_FLUSH_INTERVAL)
+        flush_stats()
+
+def close_db():
+    # При выходе: сбрасываем накопленную статистику и закрываем общее
+    # соединение — SQLite при этом переносит WAL в основной файл.
+    global _CONN
+    flush_stats()
+    with _DB_LOCK:
+        while _readers:
+            _readers.pop().close()
+        while not _reader_pool.empty():
+            _reader_pool.get_nowait()
+        if _CONN is not None:
+            _CONN.close()
+            _CONN = None
+
+atexit.register(close_db)
+
+@safe_db_read
+def _load_stats(cur, user_id):
+    cur.execute(_SQL_GET_STATS, (user_id,))
+    return cur.fetchone()
+
+def get_stats(user_id):
+    # К сохранённым значениям добавляем ещё не сброшенные приращения.
+    stats = list(_load_stats(user_id) or (0, 0, 0))
+    with _stat_lock:
+        for i, field in enumerate(STAT_FIELDS):
+            stats[i] += _stat_deltas.get((user_id, field), 0)
+    return tuple(stats)
+
+STEAM_OWNED_GAMES_URL = "https://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+
+# Одна сессия на процесс: keep-alive сохраняет TLS-соединение с Steam между
+# проверками. Пул адаптера потокобезопасен, а запросы идут из to_thread.
+_steam_session = requests.Session()
+_steam_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
 
-def verify_user_steam(tg_id, steam_id):
+@safe_db_execute
+def save_verified_hours(cur, tg_id, hours):
+    cur.execute(_SQL_SET_VERIFIED_HOURS, (hours, tg_id))
+    invalidate_profile(tg_id)
+
+def verify_user_steam(steam_id):
+    """Часы в Rust по данным Steam или код ошибки строкой. В базу не пишет."""
     try:
         if not validate_steam_id(steam_id):
             return "invalid_id"
         if not STEAM_API_KEY:
             return "no_api_key"
 
-        url = "http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
         params = {
             "key": STEAM_API_KEY,
             "steamid": steam_id,
             "format": "json",
             "appids_filter[0]": 252490,
         }
-        response = requests.get(url, params=params, timeout=10)
+        response = _steam_session.get(STEAM_OWNED_GAMES_URL, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
-        games = data.get("response", {}).get("games", [])
-        for game in games:
-            if game["appid"] == 252490:
-                hours = game.get("playtime_forever", 0) // 60
-                try:
-                    with Database() as cur:
-                        cur.execute(
-                            "UPDATE users SET hours = ?, is_verified = 1 WHERE telegram_id = ?",
-                            (hours, tg_id),
-                        )
-                    return hours
-                except sqlite3.Error as e:
-                    logger.error(f"Database error updating user profile: {e}")
-                    return "db_error"
-        return "no_game"
+        # appids_filter оставляет в ответе только Rust, так что искать по списку не нужно.
+        games = data.get("response", {}).get("games") or []
+        if not games:
+            return "no_game"
+        return games[0].get("playtime_forever", 0) // 60
     except requests.exceptions.RequestException as e:
         logger.error(f"Steam API request failed: {e}")
         return "api_error"
@@ -417,69 +947,114 @@ def verify_user_steam(tg_id, steam_id):
 # ───────────────────────────────────────
 #   КЛАВИАТУРА (кнопки)
 # ───────────────────────────────────────
-def main_keyboard():
-    return ReplyKeyboardMarkup(
-        [
-            [KeyboardButton("🔍 Найти напарника"), KeyboardButton("🔄 Обновить анкету")],
-            [KeyboardButton("👤 Профиль"), KeyboardButton("📊 Статистика")],
-            [KeyboardButton("❤️ Посмотреть лайки"), KeyboardButton("🔕 Скрыть анкету")],
-        ],
-        resize_keyboard=True,
-    )
-def admin_main_keyboard():
-    return ReplyKeyboardMarkup(
-        [
-            [KeyboardButton("🔍 Найти напарника"), KeyboardButton("🔄 Обновить анкету")],
-            [KeyboardButton("👤 Профиль"), KeyboardButton("📊 Статистика")],
-            [KeyboardButton("❤️ Посмотреть лайки"), KeyboardButton("🔕 Скрыть анкету")],
-            [KeyboardButton("⚙️ Админ-панель")],
-        ],
-        resize_keyboard=True,
-    )
-
-def profile_keyboard():
-    return InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("✅ Показывать", callback_data="activate_profile")],
-            [InlineKeyboardButton("❌ Скрыть", callback_data="deactivate_profile")],
-        ]
-    )
-
-def steam_keyboard():
-    return InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("🎮 Привязать Steam", callback_data="link_steam")],
-            [InlineKeyboardButton("✍️ Ввести часы вручную", callback_data="manual_hours")],
-        ]
-    )
-
-def steam_help_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("❓ Как найти Steam ID", callback_data="steam_help")],
-        [InlineKeyboardButton("⬅️ Назад", callback_data="back_to_hours")],
-    ])
+# Разметка не меняется, поэтому собираем её один раз при импорте.
+MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [KeyboardButton("🔍 Найти напарника"), KeyboardButton("🔄 Обновить анкету")],
+        [KeyboardButton("👤 Профиль"), KeyboardButton("📊 Статистика")],
+        [KeyboardButton("❤️ Посмотреть лайки"), KeyboardButton("🔕 Скрыть анкету")],
+    ],
+    resize_keyboard=True,
+)
+ADMIN_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    [
+        [KeyboardButton("🔍 Найти напарника"), KeyboardButton("🔄 Обновить анкету")],
+        [KeyboardButton("👤 Профиль"), KeyboardButton("📊 Статистика")],
+        [KeyboardButton("❤️ Посмотреть лайки"), KeyboardButton("🔕 Скрыть анкету")],
+        [KeyboardButton("⚙️ Админ-панель")],
+    ],
+    resize_keyboard=True,
+)
 
-def subscribe_keyboard():
+PROFILE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Показывать", callback_data="activate_profile")],
+    [InlineKeyboardButton("❌ Скрыть", callback_data="deactivate_profile")],
+])
+STEAM_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎮 Привязать Steam", callback_data="link_steam")],
+    [InlineKeyboardButton("✍️ Ввести часы вручную", callback_data="manual_hours")],
+])
+STEAM_HELP_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("❓ Как найти Steam ID", callback_data="steam_help")],
+    [InlineKeyboardButton("⬅️ Назад", callback_data="back_to_hours")],
+])
+SUBSCRIBE_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔔 Подписаться", url=SUBSCRIBE_URL)],
+    [InlineKeyboardButton("🔄 Проверить подписку", callback_data="check_subscription")],
+])
+RESTART_SEARCH_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Начать сначала", callback_data="restart_search")],
+    [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")],
+])
+BACK_TO_HOURS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⬅️ Назад", callback_data="back_to_hours")],
+])
+BANNED_KEYBOARD = ReplyKeyboardMarkup([[KeyboardButton("ℹ️ Помощь")]], resize_keyboard=True)
+ADMIN_PANEL_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Посмотреть жалобы", callback_data="admin_action_reports")],
+    [InlineKeyboardButton("🚫 Заблокировать пользователя", callback_data="admin_action_block")],
+    [InlineKeyboardButton("🔓 Разблокировать пользователя", callback_data="admin_action_unblock")],
+    [InlineKeyboardButton("📋 Список заблокированных", callback_data="admin_action_blocked_list")],
+])
+ADMIN_BACK_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⬅️ Назад", callback_data="admin_back_to_reports")],
+])
+
+# Объекты разметки PTB неизменяемы, поэтому клавиатуру карточки можно
+# безопасно переиспользовать для одного и того же напарника.
+@lru_cache(maxsize=1024)
+def partner_keyboard(partner_id):
     return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔔 Подписаться", url=f"https://t.me/{REQUIRED_CHANNEL[1:]}")],
-        [InlineKeyboardButton("🔄 Проверить подписку", callback_data="check_subscription")],
+        [
+            InlineKeyboardButton("❤️ Лайк", callback_data=f"like_{partner_id}"),
+            InlineKeyboardButton("👎 Дизлайк", callback_data=f"dislike_{partner_id}"),
+        ],
+        [InlineKeyboardButton("🚨 Пожаловаться", callback_data=f"report_{partner_id}")],
     ])
 
-def restart_search_keyboard():
+# То же для карточки входящего лайка: меняются только ID и позиция в списке.
+@lru_cache(maxsize=1024)
+def like_keyboard(from_id, idx, total):
     return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔄 Начать сначала", callback_data="restart_search")],
-        [InlineKeyboardButton("🏠 Главное меню", callback_data="main_menu")]
+        [
+            InlineKeyboardButton("❤️ Ответить", callback_data=f"respond_like_{from_id}"),
+            InlineKeyboardButton("👎 Отклонить", callback_data=f"respond_dislike_{from_id}"),
+        ],
+        [InlineKeyboardButton("🚨 Пожаловаться", callback_data=f"report_{from_id}")],
+        [
+            InlineKeyboardButton("⬅️", callback_data=f"prev_{idx}"),
+            InlineKeyboardButton(f"{idx+1}/{total}", callback_data="noop"),
+            InlineKeyboardButton("➡️", callback_data=f"next_{idx}"),
+        ],
     ])
 
 def get_user_keyboard(user_id: int):
-    return admin_main_keyboard() if user_id in ADMIN_IDS else main_keyboard()
+    return ADMIN_MAIN_KEYBOARD if user_id in ADMIN_IDS else MAIN_KEYBOARD
+
+# Подтверждённая подписка кэшируется на SUBSCRIPTION_CACHE_TTL секунд:
+# иначе каждое нажатие кнопки стоит лишнего запроса к Telegram. Отказ не
+# кэшируем — только что подписавшийся пользователь не должен ждать.
+SUBSCRIPTION_CACHE_TTL = 300
+SUBSCRIPTION_CACHE_SIZE = 50_000
+_sub_cache = {}
 
 async def check_subscription(user_id, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    checked_at = _sub_cache.get(user_id)
+    if checked_at is not None and time.monotonic() - checked_at < SUBSCRIPTION_CACHE_TTL:
+        return True
+    _sub_cache.pop(user_id, None)
     try:
         member = await context.bot.get_chat_member(REQUIRED_CHANNEL, user_id)
-        return member.status in ["member", "administrator", "creator"]
     except Exception:
         return False
+    if member.status not in ["member", "administrator", "creator"]:
+        return False
+    # Словарь хранит порядок вставки: при переполнении вытесняем самую
+    # старую запись.
+    if len(_sub_cache) >= SUBSCRIPTION_CACHE_SIZE:
+        _sub_cache.pop(next(iter(_sub_cache)), None)
+    _sub_cache[user_id] = time.monotonic()
+    return True
 
 async def ask_to_subscribe(update: Update):
     await update.message.reply_text(
@@ -487,31 +1062,38 @@ async def ask_to_subscribe(update: Update):
         f"Чтобы пользоваться нашим ботом, подпишитесь на канал:\n"
         f"👉 {REQUIRED_CHANNEL}\n\n"
         f"Это поможет нам развивать сообщество. Спасибо! ❤️",
-        reply_markup=subscribe_keyboard(),
+        reply_markup=SUBSCRIBE_KEYBOARD,
     )
 
 def subscription_required(func):
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
 
-        if is_user_banned(user.id):
-            banned_until = get_banned_until(user.id)
-            dt = datetime.fromisoformat(banned_until)
+        # Обычно это поиск в словаре; при промахе кэша список банов грузим
+        # в пуле потоков, не останавливая цикл событий.
+        blocked = _blocked_cache
+        if blocked is None:
+            blocked = await run_db(cached_blocked)
+        banned_until = get_active_ban(user.id, blocked)
+        if banned_until:
+            dt = datetime.fromtimestamp(banned_until)
             if update.message:
                 await update.message.reply_text(
                     f"⏳ Вы временно ограничены в использовании бота до {dt.strftime('%d.%m %H:%M')}.\n"
                     "Спасибо за понимание.",
-                    reply_markup=ReplyKeyboardMarkup([[KeyboardButton("ℹ️ Помощь")]], resize_keyboard=True)
+                    reply_markup=BANNED_KEYBOARD
                 )
             else:
                 await update.callback_query.answer()
                 await update.callback_query.edit_message_text(
                     f"⏳ Вы временно ограничены в использовании бота до {dt.strftime('%d.%m %H:%M')}.\n"
-                    "Спасибо за понимание.",
-                    reply_markup=ReplyKeyboardMarkup([[KeyboardButton("ℹ️ Помощь")]], resize_keyboard=True)
+                    "Спасибо за понимание."
                 )
             return
 
+        if update.callback_query and update.callback_query.data == "check_subscription":
+            # Пользователь сам просит перепроверить подписку — идём в API.
+            _sub_cache.pop(user.id, None)
         if not await check_subscription(user.id, context):
             text = (
                 f"❌ Чтобы пользоваться ботом, подпишитесь на канал:\n"
@@ -519,10 +1101,10 @@ def subscription_required(func):
                 "После этого нажмите кнопку ниже, чтобы проверить:"
             )
             if update.message:
-                await update.message.reply_text(text, reply_markup=subscribe_keyboard())
+                await update.message.reply_text(text, reply_markup=SUBSCRIBE_KEYBOARD)
             else:
                 await update.callback_query.answer()
-                await update.callback_query.edit_message_text(text, reply_markup=subscribe_keyboard())
+                await update.callback_query.edit_message_text(text, reply_markup=SUBSCRIBE_KEYBOARD)
             return
         return await func(update, context)
     return wrapper
@@ -535,13 +1117,53 @@ def admin_only(func):
         return await func(update, context)
     return wrapper
 
+# ───────────────────────────────────────
+#   ШАБЛОНЫ СООБЩЕНИЙ
+# ───────────────────────────────────────
+# Спецсимволы Markdown в пользовательском тексте (имя, био, username)
+# экранируются, иначе Telegram отклоняет сообщение целиком.
+_MD_ESCAPE = str.maketrans({"_": "\\_", "*": "\\*", "`": "\\`", "[": "\\["})
+
+def escape_md(value):
+    return str(value).translate(_MD_ESCAPE)
+
+PARTNER_TMPL = (
+    "👤 *Найден напарник {badge}*\n\n"
+    "📛 Имя: {name}\n"
+    "⏰ Часы в Rust: {hours}\n"
+    "🎂 Возраст: {age}\n"
+    "💬 О себе: {bio}"
+)
+
+PROFILE_TMPL = (
+    "📋 *Твой профиль {verified}*\n\n"
+    "📛 Имя: {name}\n"
+    "⏰ Часы в Rust: {hours}\n"
+    "🎂 Возраст: {age}\n"
+    "💬 О себе: {bio}\n"
+    "🔗 Telegram: {link}\n"
+    "👁️ Статус: {status}"
+)
+
+MATCH_TMPL = "🎉 *Матч!* {link} тоже вас лайкнул!"
+
+LIKE_TMPL = (
+    "❤️ *Тебя лайкнул(а) {from_name}! {badge}*\n\n"
+    "👤 *Профиль*\n"
+    "📛 Имя: {name}\n"
+    "⏰ Часы: {hours}\n"
+    "🎂 Возраст: {age}\n"
+    "💬 О себе: {bio}\n"
+    "🔗 Telegram: {link}"
+)
+
 # ───────────────────────────────────────
 #   ХЭНДЛЕРЫ
 # ───────────────────────────────────────
 @subscription_required
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    if has_profile(user.id):
+    if await run_db(has_profile, user.id):
         welcome_text = f"👋 С возвращением, {user.first_name}!"
     else:
         welcome_text = f"👋 Привет, {user.first_name}! Создайте свою анкету, чтобы начать поиск напарника."
@@ -570,7 +1192,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 @subscription_required
 async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    data = get_user_profile(user.id)
+    data = await run_db(get_user_profile, user.id)
     if not data:
         await update.message.reply_text(
             "❌ У вас нет анкеты. Нажмите «🔄 Обновить анкету».",
@@ -578,23 +1200,23 @@ async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     name, hours, age, bio, username, is_active, is_verified = data
-    status = "✅ Показывается" if is_active else "❌ Скрыта"
-    verified = "✅ ВЕРИФИЦИРОВАН" if is_verified else ""
     await update.message.reply_text(
-        f"📋 *Твой профиль {verified}*\n\n"
-        f"📛 Имя: {name}\n"
-        f"⏰ Часы в Rust: {hours}\n"
-        f"🎂 Возраст: {age}\n"
-        f"💬 О себе: {bio}\n"
-        f"🔗 Telegram: @{username if username else 'не указано'}\n"
-        f"👁️ Статус: {status}",
+        PROFILE_TMPL.format_map({
+            "verified": "✅ ВЕРИФИЦИРОВАН" if is_verified else "",
+            "name": escape_md(name),
+            "hours": hours,
+            "age": age,
+            "bio": escape_md(bio),
+            "link": f"@{escape_md(username)}" if username else "не указано",
+            "status": "✅ Показывается" if is_active else "❌ Скрыта",
+        }),
         parse_mode="Markdown",
-        reply_markup=profile_keyboard(),
+        reply_markup=PROFILE_KEYBOARD,
     )
 
 @subscription_required
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    viewed, likes, matches = get_stats(update.effective_user.id)
+    viewed, likes, matches = await run_db(get_stats, update.effective_user.id)
     await update.message.reply_text(
         "📊 *Твоя статистика*\n\n"
         f"👁️ Просмотрено анкет: {viewed}\n"
@@ -604,37 +1226,57 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=get_user_keyboard(update.effective_user.id),
     )
 
-def advanced_similarity(current_hours, current_age, partner):
-    _, _, hours, age, bio, _, is_verified = partner
-    diff = abs(hours - current_hours) * 0.5 + abs(age - current_age) * 0.5
-    verified_bonus = -20 if is_verified else 0
-    keyword_bonus = -10 if bio and any(w in bio.lower() for w in ["спокойный", "тихий", "база", "дружелюбный"]) else 0
-    return diff + verified_bonus + keyword_bonus
+PARTNER_KEYWORDS = ("спокойный", "тихий", "база", "дружелюбный")
+# Один проход скомпилированного выражения вместо цикла по словам. Регистр
+# снимаем через lower(): re.IGNORECASE на кириллице заметно медленнее.
+_KW_RE = re.compile("|".join(map(re.escape, PARTNER_KEYWORDS)))
+
+def bio_keyword_bonus(bio):
+    # Регистрируется в SQLite как bio_bonus() и используется при ранжировании.
+    return -10 if bio and _KW_RE.search(bio.lower()) else 0
+
+RANKED_CACHE_TTL = 300
 
 @subscription_required
 async def find_partner(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _find_partner(update, context)
+
+async def _find_partner(update: Update, context: ContextTypes.DEFAULT_TYPE, profile=None):
+    # Без проверки подписки: её уже сделал вызывающий хэндлер. profile можно
+    # передать, если анкета уже загружена.
     user = update.effective_user
     chat_id = update.effective_chat.id
     if not limiter.check_limit(user.id, "find_partner", 10, 60):
         await update.message.reply_text("⚠️ Слишком много запросов. Подождите минуту.")
         return
-    if not has_profile(user.id):
+    if profile is None:
+        profile = await run_db(get_user_profile, user.id)
+    if profile is None:
         await context.bot.send_message(
             chat_id=chat_id,
             text="📝 Сначала создайте анкету. Нажмите «🔄 Обновить анкету».",
             reply_markup=get_user_keyboard(user.id),
         )
         return
-    profile = get_user_profile(user.id)
-    if not profile:
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text="❌ Ошибка загрузки профиля.",
-            reply_markup=get_user_keyboard(user.id),
-        )
+    ranked_at = context.user_data.get("ranked_at")
+    if (
+        context.user_data.get("partner_queue")
+        and context.user_data.get("ranked_version") == _users_version
+        and ranked_at is not None
+        and time.monotonic() - ranked_at < RANKED_CACHE_TTL
+    ):
+        # Выдача ещё свежая — продолжаем листать её без повторного запроса.
+        # Карточку на экране пользователь ещё не оценил: показываем её снова.
+        current_id = context.user_data.get("current_partner_id")
+        if current_id is not None:
+            context.user_data["partner_queue"].appendleft(current_id)
+        await next_partner(chat_id, context, user.id)
         return
+    # Версию снимаем до запроса: запись, закоммиченная во время ранжирования,
+    # должна сделать эту выдачу устаревшей.
+    version = _users_version
     cur_hours, cur_age = profile[1], profile[2]
-    partners = get_all_active_partners(user.id)
+    partners = await run_db(get_ranked_partners, user.id, cur_hours, cur_age)
     if not partners:
         await context.bot.send_message(
             chat_id=chat_id,
@@ -642,52 +1284,51 @@ async def find_partner(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_user_keyboard(user.id),
         )
         return
-    partners_sorted = sorted(partners, key=lambda p: advanced_similarity(cur_hours, cur_age, p))
-    context.user_data["partner_queue"] = [p[0] for p in partners_sorted]
-    context.user_data["partner_data"] = {p[0]: p for p in partners_sorted}
-    context.user_data["current_partner_index"] = 0
-    context.user_data["original_partners"] = [p[0] for p in partners_sorted]
-    await show_partner(chat_id, context, partners_sorted[0])
+    # Первая анкета показывается сразу, в очереди остаются следующие.
+    # Полный список ID (кортеж, без анкет) нужен только для restart_search.
+    partner_ids = tuple(p[0] for p in partners)
+    context.user_data["partner_queue"] = deque(partner_ids[1:])
+    context.user_data["original_partners"] = partner_ids
+    context.user_data["ranked_at"] = time.monotonic()
+    context.user_data["ranked_version"] = version
+    await show_partner(chat_id, context, partners[0])
 
 async def show_partner(chat_id, context: ContextTypes.DEFAULT_TYPE, partner):
     partner_id, name, hours, age, bio, username, is_verified = partner
     context.user_data["current_partner_id"] = partner_id
-    verified_badge = "✅" if is_verified else ""
-    kb = [
-        [
-            InlineKeyboardButton("❤️ Лайк", callback_data=f"like_{partner_id}"),
-            InlineKeyboardButton("👎 Дизлайк", callback_data=f"dislike_{partner_id}"),
-        ],
-        [InlineKeyboardButton("🚨 Пожаловаться", callback_data=f"report_{partner_id}")],
-    ]
-    markup = InlineKeyboardMarkup(kb)
+    markup = partner_keyboard(partner_id)
     await context.bot.send_message(
         chat_id=chat_id,
-        text=(
-            f"👤 *Найден напарник {verified_badge}*\n\n"
-            f"📛 Имя: {name}\n"
-            f"⏰ Часы в Rust: {hours}\n"
-            f"🎂 Возраст: {age}\n"
-            f"💬 О себе: {bio}"
-        ),
+        text=PARTNER_TMPL.format_map({
+            "badge": "✅" if is_verified else "",
+            "name": escape_md(name),
+            "hours": hours,
+            "age": age,
+            "bio": escape_md(bio),
+        }),
         parse_mode="Markdown",
         reply_markup=markup,
     )
 
+def forget_current_partner(context: ContextTypes.DEFAULT_TYPE, partner_id):
+    # Оценённую карточку find_partner повторно не показывает.
+    if context.user_data.get("current_partner_id") == partner_id:
+        del context.user_data["current_partner_id"]
+
 async def next_partner(chat_id, context: ContextTypes.DEFAULT_TYPE, user_id):
-    queue = context.user_data.get("partner_queue", [])
-    if not queue:
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text="🎉 Вы просмотрели всех доступных напарников!\n\nХотите начать поиск заново?",
-            reply_markup=restart_search_keyboard(),
-        )
-        return
-    next_id = queue.pop(0)
-    context.user_data["partner_queue"] = queue
-    partner = context.user_data.get("partner_data", {}).get(next_id)
-    if partner:
-        await show_partner(chat_id, context, partner)
+    # В сессии лежат только ID; анкету берём из кэша/базы в момент показа.
+    # Удалённые с момента поиска анкеты пропускаем циклом, без рекурсии.
+    queue = context.user_data.get("partner_queue")
+    while queue:
+        partner = await run_db(get_user_profile_full, queue.popleft())
+        if partner:
+            await show_partner(chat_id, context, partner)
+            return
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text="🎉 Вы просмотрели всех доступных напарников!\n\nХотите начать поиск заново?",
+        reply_markup=RESTART_SEARCH_KEYBOARD,
+    )
 
 @subscription_required
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -706,27 +1347,24 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if step == "age":
-        try:
-            age = int(text)
-            if not validate_age(age):
-                raise ValueError
-            context.user_data["age"] = age
-            await update.message.reply_text("⏰ Как указать часы в Rust?", reply_markup=steam_keyboard())
-            context.user_data["step"] = "choose_method"
-        except ValueError:
+        age = parse_int(text)
+        if age is None or not validate_age(age):
             await update.message.reply_text("Возраст — число от 10 до 100.")
+            return
+        context.user_data["age"] = age
+        await update.message.reply_text("⏰ Как указать часы в Rust?", reply_markup=STEAM_KEYBOARD)
+        context.user_data["step"] = "choose_method"
         return
 
     if step == "hours_manual":
-        try:
-            hours = int(text)
-            if not validate_hours(hours):
-                raise ValueError
-            context.user_data["hours"] = hours
-            await update.message.reply_text("💬 Расскажите немного о себе:")
-            context.user_data["step"] = "bio"
-        except ValueError:
+        hours = parse_int(text)
+        if hours is None or not validate_hours(hours):
             await update.message.reply_text("Часы — число от 0 до 20000.")
+            return
+        context.user_data["hours"] = hours
+        context.user_data["is_verified"] = 0
+        await update.message.reply_text("💬 Расскажите немного о себе:")
+        context.user_data["step"] = "bio"
         return
 
     if step == "waiting_steam_id":
@@ -734,13 +1372,17 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not steam_id.isdigit():
             await update.message.reply_text("⚠️ Введите только цифры вашего Steam-ID.")
             return
-        result = verify_user_steam(user.id, steam_id)
+        # Запрос к Steam идёт до 10 секунд — выполняем его в потоке, чтобы
+        # бот тем временем отвечал остальным пользователям.
+        result = await asyncio.to_thread(verify_user_steam, steam_id)
         if isinstance(result, int):
+            await run_db(save_verified_hours, user.id, result)
             context.user_data["hours"] = result
+            context.user_data["is_verified"] = 1
             await update.message.reply_text(f"✅ Получено {result} часов из Steam.\n💬 Теперь расскажите немного о себе:")
             context.user_data["step"] = "bio"
         else:
-            await update.message.reply_text("❌ Не удалось получить данные. Введите часы вручную:", reply_markup=steam_keyboard())
+            await update.message.reply_text("❌ Не удалось получить данные. Введите часы вручную:", reply_markup=STEAM_KEYBOARD)
             context.user_data["step"] = "hours_manual"
         return
 
@@ -749,7 +1391,8 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("Текст — от 5 до 500 символов.")
             return
         context.user_data["bio"] = text
-        save_user(
+        saved = await run_db(
+            save_user,
             user.id,
             context.user_data["name"],
             context.user_data["hours"],
@@ -757,8 +1400,12 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             context.user_data["bio"],
             user.username,
             is_active=1,
-            is_verified=0,
+            is_verified=context.user_data.get("is_verified", 0),
         )
+        if not saved:
+            # Шаг не сбрасываем: пользователь может отправить описание ещё раз.
+            await update.message.reply_text("❌ Не удалось сохранить анкету. Попробуйте ещё раз.")
+            return
         await update.message.reply_text(
             "✅ Анкета успешно создана! Теперь вы можете искать напарников.",
             reply_markup=get_user_keyboard(user.id),
@@ -766,25 +1413,14 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data.clear()
         return
 
-    if has_profile(user.id):
-        if text == "🔍 Найти напарника":
-            await find_partner(update, context)
-        elif text == "👤 Профиль":
-            await profile_command(update, context)
-        elif text == "📊 Статистика":
-            await stats_command(update, context)
-        elif text == "❤️ Посмотреть лайки":
-            await show_likes_command(update, context)
-        elif text == "🔕 Скрыть анкету":
-            deactivate_user(user.id)
-            await update.message.reply_text(
-                "❌ Ваша анкета скрыта из поиска.", reply_markup=get_user_keyboard(user.id)
-            )
-        elif text == "⚙️ Админ-панель":
-            if user.id in ADMIN_IDS:
-                await show_admin_panel(update, context)
-            else:
-                await update.message.reply_text("❌ У вас нет прав для этого действия.")
+    profile = await run_db(get_user_profile, user.id)
+    if profile is not None:
+        handler = BUTTON_HANDLERS.get(text)
+        if handler is find_partner:
+            # Анкета уже загружена — поиск не читает её второй раз.
+            await _find_partner(update, context, profile)
+        elif handler:
+            await handler(update, context)
         else:
             await update.message.reply_text(
                 "Не понял. Выберите действие из меню.", reply_markup=get_user_keyboard(user.id)
@@ -804,7 +1440,7 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = query.from_user
     step = context.user_data.get("step")
 
-    if not has_profile(user.id) and step not in {"waiting_steam_id", "choose_method", "hours_manual"}:
+    if not await run_db(has_profile, user.id) and step not in {"waiting_steam_id", "choose_method", "hours_manual"}:
         allowed_data = ["link_steam", "manual_hours", "steam_help", "back_to_hours", "check_subscription"]
         if data not in allowed_data:
             await query.edit_message_text(
@@ -819,7 +1455,7 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Отправьте ваш Steam-ID (только цифры).\n"
             "❓ Как найти ID? — нажмите кнопку ниже.",
             parse_mode="Markdown",
-            reply_markup=steam_help_keyboard()
+            reply_markup=STEAM_HELP_KEYBOARD
         )
         context.user_data["step"] = "waiting_steam_id"
         return
@@ -840,177 +1476,240 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Ваш ID — числа после */profiles/*.\n\n"
             "⬅️ Вернуться",
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data="back_to_hours")]])
+            reply_markup=BACK_TO_HOURS_KEYBOARD
         )
         return
 
     if data == "back_to_hours":
         await query.edit_message_text(
             "⏰ Как указать часы в Rust?",
-            reply_markup=steam_keyboard()
+            reply_markup=STEAM_KEYBOARD
         )
         context.user_data["step"] = "choose_method"
         return
 
     await handle_callback(update, context)
 
+@subscription_required
 async def pagination_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     if not query:
         return
     await query.answer()
-    data = query.data.split("_")
-    direction = data[0]
-    idx = int(data[1])
+    direction, _, idx = query.data.partition("_")
+    idx = int(idx)
     pending = context.user_data.get("pending_likes", [])
     if not pending:
         return
     new_idx = max(0, idx - 1) if direction == "prev" else min(len(pending) - 1, idx + 1)
     context.user_data["current_like_index"] = new_idx
-    await show_next_like(query.message, context)
+    await show_next_like(query.message.chat_id, context, query.from_user.id)
 
 @subscription_required
 async def show_likes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    pending = get_pending_likes(user.id)
+    pending = await run_db(get_pending_likes, user.id)
     if not pending:
         await update.message.reply_text("❌ Пока нет новых лайков.", reply_markup=get_user_keyboard(user.id))
         return
     context.user_data["pending_likes"] = pending
     context.user_data["current_like_index"] = 0
-    await show_next_like(update, context)
+    await show_next_like(update.effective_chat.id, context, user.id)
 
-async def show_next_like(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_next_like(chat_id, context: ContextTypes.DEFAULT_TYPE, user_id):
+    # Лайки от удалённых анкет пропускаем циклом, без рекурсии; индекс
+    # сохраняем один раз, когда нашли, что показать.
     pending = context.user_data.get("pending_likes", [])
     idx = context.user_data.get("current_like_index", 0)
-    if idx >= len(pending):
-        await update.message.reply_text("✅ Все лайки просмотрены!", reply_markup=get_user_keyboard(update.effective_user.id))
-        return
-    from_id, from_name = pending[idx]
-    profile = get_user_profile(from_id)
+    profile = None
+    while idx < len(pending):
+        from_id, from_name = pending[idx]
+        profile = await run_db(get_user_profile, from_id)
+        if profile:
+            break
+        idx += 1
+    context.user_data["current_like_index"] = idx
     if not profile:
-        context.user_data["current_like_index"] = idx + 1
-        await show_next_like(update, context)
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text="✅ Все лайки просмотрены!",
+            reply_markup=get_user_keyboard(user_id),
+        )
         return
     name, hours, age, bio, username, _, is_verified = profile
-    verified_badge = "✅" if is_verified else ""
-    kb = [
-        [
-            InlineKeyboardButton("❤️ Ответить", callback_data=f"respond_like_{from_id}"),
-            InlineKeyboardButton("👎 Отклонить", callback_data=f"respond_dislike_{from_id}"),
-        ],
-        [InlineKeyboardButton("🚨 Пожаловаться", callback_data=f"report_{from_id}")],
-        [
-            InlineKeyboardButton("⬅️", callback_data=f"prev_{idx}"),
-            InlineKeyboardButton(f"{idx+1}/{len(pending)}", callback_data="noop"),
-            InlineKeyboardButton("➡️", callback_data=f"next_{idx}"),
-        ],
-    ]
-    markup = InlineKeyboardMarkup(kb)
-    await update.message.reply_text(
-        f"❤️ *Тебя лайкнул(а) {from_name}! {verified_badge}*\n\n"
-        f"👤 *Профиль*\n"
-        f"📛 Имя: {name}\n"
-        f"⏰ Часы: {hours}\n"
-        f"🎂 Возраст: {age}\n"
-        f"💬 О себе: {bio}\n"
-        f"🔗 Telegram: @{username if username else 'не указано'}",
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=LIKE_TMPL.format_map({
+            "from_name": escape_md(from_name),
+            "badge": "✅" if is_verified else "",
+            "name": escape_md(name),
+            "hours": hours,
+            "age": age,
+            "bio": escape_md(bio),
+            "link": f"@{escape_md(username)}" if username else "не указано",
+        }),
         parse_mode="Markdown",
-        reply_markup=markup,
+        reply_markup=like_keyboard(from_id, idx, len(pending)),
     )
 
 async def notify_match(context: ContextTypes.DEFAULT_TYPE, user_a: int, user_b: int):
-    a_profile = get_user_profile(user_a)
-    b_profile = get_user_profile(user_b)
-    if not a_profile or not b_profile:
+    profiles = await run_db(get_user_profiles, [user_a, user_b])
+    if user_a not in profiles or user_b not in profiles:
         return
-    _, _, _, _, _, username_a = a_profile
-    _, _, _, _, _, username_b = b_profile
-    link_a = f"@{username_a}" if username_a else "не указано"
-    link_b = f"@{username_b}" if username_b else "не указано"
-    try:
-        await context.bot.send_message(chat_id=user_a, text=f"🎉 *Матч!* {link_b} тоже вас лайкнул!", parse_mode="Markdown")
-    except Exception as e:
-        logger.error(f"Failed to send match notification to user {user_a}: {e}")
-    try:
-        await context.bot.send_message(chat_id=user_b, text=f"🎉 *Матч!* {link_a} тоже вас лайкнул!", parse_mode="Markdown")
-    except Exception as e:
-        logger.error(f"Failed to send match notification to user {user_b}: {e}")
+    username_a = profiles[user_a][4]
+    username_b = profiles[user_b][4]
+    # Подчёркивания в никах ломают Markdown — без экранирования Telegram
+    # отклоняет сообщение целиком.
+    link_a = f"@{escape_md(username_a)}" if username_a else "не указано"
+    link_b = f"@{escape_md(username_b)}" if username_b else "не указано"
+    results = await asyncio.gather(
+        context.bot.send_message(chat_id=user_a, text=MATCH_TMPL.format(link=link_b), parse_mode="Markdown"),
+        context.bot.send_message(chat_id=user_b, text=MATCH_TMPL.format(link=link_a), parse_mode="Markdown"),
+        return_exceptions=True,
+    )
+    for target_id, result in zip((user_a, user_b), results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to send match notification to user {target_id}: {result}")
 
 async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("📊 Посмотреть жалобы", callback_data="admin_action_reports")],
-            [InlineKeyboardButton("🚫 Заблокировать пользователя", callback_data="admin_action_block")],
-            [InlineKeyboardButton("🔓 Разблокировать пользователя", callback_data="admin_action_unblock")],
-            [InlineKeyboardButton("📋 Список заблокированных", callback_data="admin_action_blocked_list")],
-        ]
+    await update.message.reply_text("⚙️ *Админ-панель:*", parse_mode="Markdown", reply_markup=ADMIN_PANEL_KEYBOARD)
+
+async def admin_panel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id in ADMIN_IDS:
+        await show_admin_panel(update, context)
+    else:
+        await update.message.reply_text("❌ У вас нет прав для этого действия.")
+
+async def hide_profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    await run_db(deactivate_user, user.id)
+    await update.message.reply_text(
+        "❌ Ваша анкета скрыта из поиска.", reply_markup=get_user_keyboard(user.id)
     )
-    await update.message.reply_text("⚙️ *Админ-панель:*", parse_mode="Markdown", reply_markup=keyboard)
 
+# Кнопки главного меню → обработчики (для пользователей с анкетой)
+BUTTON_HANDLERS = {
+    "🔍 Найти напарника": find_partner,
+    "👤 Профиль": profile_command,
+    "📊 Статистика": stats_command,
+    "❤️ Посмотреть лайки": show_likes_command,
+    "🔕 Скрыть анкету": hide_profile_command,
+    "⚙️ Админ-панель": admin_panel_command,
+}
+
+# Лайк и дизлайк — самые частые нажатия, поэтому PTB направляет их сюда
+# сам по pattern, минуя handle_button и разбор в handle_callback.
 @subscription_required
-async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_like(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    if not query:
-        return
     await query.answer()
-    data = query.data.split("_")
-    action = data[0]
+    partner_id = int(query.data[5:])
+    user_id = query.from_user.id
+    is_match = await run_db(add_like, user_id, partner_id)
+    update_stat(user_id, "likes_given")
+    forget_current_partner(context, partner_id)
+    if is_match:
+        # Правка карточки и рассылка уведомлений независимы — шлём параллельно.
+        await asyncio.gather(
+            query.edit_message_text("🎉 *У вас взаимный матч!*", parse_mode="Markdown"),
+            notify_match(context, user_id, partner_id),
+        )
+    else:
+        await query.edit_message_text("❤️ Вы поставили лайк. Ищем дальше…")
+        await run_db(add_pending_like, user_id, partner_id, query.from_user.first_name)
+        await next_partner(query.message.chat_id, context, user_id)
 
-    if action in ("like", "dislike"):
-        partner_id = int(data[1])
-        user_id = query.from_user.id
-        if action == "like":
-            is_match = add_like(user_id, partner_id)
-            update_stat(user_id, "likes_given")
-            if is_match:
-                await query.edit_message_text("🎉 *У вас взаимный матч!*", parse_mode="Markdown")
-                await notify_match(context, user_id, partner_id)
-            else:
-                await query.edit_message_text("❤️ Вы поставили лайк. Ищем дальше…")
-                add_pending_like(user_id, partner_id, query.from_user.first_name)
-                await next_partner(query.message.chat_id, context, user_id)
-        else:
-            await query.edit_message_text("👎 Вы поставили дизлайк. Ищем следующего…")
-            await next_partner(query.message.chat_id, context, user_id)
+@subscription_required
+async def handle_dislike(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    partner_id = int(query.data[8:])
+    user_id = query.from_user.id
+    await run_db(add_seen, user_id, partner_id)
+    forget_current_partner(context, partner_id)
+    await query.edit_message_text("👎 Вы поставили дизлайк. Ищем следующего…")
+    await next_partner(query.message.chat_id, context, user_id)
 
-    elif action == "respond":
-        resp_type = data[1]
-        from_id = int(data[2])
-        user_id = query.from_user.id
-        if resp_type == "like":
-            is_match = add_like(user_id, from_id)
-            remove_pending_like(from_id, user_id)
-            if is_match:
-                await query.edit_message_text("🎉 *У вас взаимный матч!*", parse_mode="Markdown")
-                await notify_match(context, user_id, from_id)
-            else:
-                await query.edit_message_text("❤️ Вы ответили лайком!")
+# Ответ на входящий лайк тоже маршрутизируется по pattern; ID берём из
+# уже совпавшего выражения.
+RESPOND_PATTERN = re.compile(r"^respond_(like|dislike)_(\d+)$")
+
+@subscription_required
+async def handle_respond(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    kind, from_id = RESPOND_PATTERN.match(query.data).groups()
+    from_id = int(from_id)
+    user_id = query.from_user.id
+    if kind == "like":
+        is_match = await run_db(add_like, user_id, from_id)
+        await run_db(remove_pending_like, from_id, user_id)
+        if is_match:
+            await asyncio.gather(
+                query.edit_message_text("🎉 *У вас взаимный матч!*", parse_mode="Markdown"),
+                notify_match(context, user_id, from_id),
+            )
         else:
-            remove_pending_like(from_id, user_id)
-            await query.edit_message_text("👎 Вы отклонили лайк.")
-        await show_next_like(query.message, context)
+            await query.edit_message_text("❤️ Вы ответили лайком!")
+    else:
+        await run_db(remove_pending_like, from_id, user_id)
+        await query.edit_message_text("👎 Вы отклонили лайк.")
+    # Отвеченный лайк убираем и из сессии, иначе он покажется снова.
+    pending = context.user_data.get("pending_likes")
+    if pending:
+        context.user_data["pending_likes"] = [p for p in pending if p[0] != from_id]
+    await show_next_like(query.message.chat_id, context, user_id)
+
+# Префиксы callback_data, после которых идёт аргумент (обычно ID).
+# Действия без аргумента (activate_profile, main_menu, …) сравниваются целиком.
+CALLBACK_PREFIXES = (
+    "report_",
+    "admin_action_",
+    "admin_clear_reports_",
+    "admin_ban_5d_",
+    "admin_unban_",
+)
+
+def parse_callback_data(data):
+    """Разбирает callback_data на (действие, аргумент) без split("_")."""
+    for prefix in CALLBACK_PREFIXES:
+        if data.startswith(prefix):
+            return prefix[:-1], data[len(prefix):]
+    return data, ""
+
+async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Вызывается только из handle_button: подписка уже проверена, query отвечен.
+    query = update.callback_query
+    action, arg = parse_callback_data(query.data)
 
-    elif action == "report":
-        reported_id = int(data[1])
+    if action == "report":
+        reported_id = int(arg)
         reporter_id = query.from_user.id
-        add_report(reporter_id, reported_id)
-        await query.edit_message_text("🚨 Жалоба отправлена. Спасибо!")
-        for admin_id in ADMIN_IDS:
-            try:
-                await context.bot.send_message(admin_id, f"🚨 Новая жалоба на пользователя {reported_id} от {reporter_id}")
-            except Exception:
-                pass
+        await run_db(add_report, reporter_id, reported_id)
+        # Подтверждение и уведомления админам уходят параллельно; ошибка
+        # отправки одному админу не мешает остальным.
+        admin_ids = tuple(ADMIN_IDS)
+        text = f"🚨 Новая жалоба на пользователя {reported_id} от {reporter_id}"
+        results = await asyncio.gather(
+            query.edit_message_text("🚨 Жалоба отправлена. Спасибо!"),
+            *(context.bot.send_message(admin_id, text) for admin_id in admin_ids),
+            return_exceptions=True,
+        )
+        if isinstance(results[0], Exception):
+            logger.error(f"Failed to confirm report from user {reporter_id}: {results[0]}")
+        for admin_id, result in zip(admin_ids, results[1:]):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to notify admin {admin_id} about report: {result}")
 
     elif action == "activate_profile":
-        activate_user(query.from_user.id)
+        await run_db(activate_user, query.from_user.id)
         await query.edit_message_text("✅ Профиль снова виден в поиске.")
     elif action == "deactivate_profile":
-        deactivate_user(query.from_user.id)
+        await run_db(deactivate_user, query.from_user.id)
         await query.edit_message_text("❌ Профиль скрыт из поиска.")
 
-    elif action == "admin" and data[1] == "action":
-        admin_action = data[2]
+    elif action == "admin_action":
+        admin_action = arg
         if admin_action == "reports":
             await reports_command(update, context)
             await query.delete_message()
@@ -1023,36 +1722,38 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.delete_message()
 
     elif action == "admin_clear_reports":
-        target_id = int(data[1])
-        clear_reports_for(target_id)
+        target_id = int(arg)
+        await run_db(clear_reports_for, target_id)
         await query.edit_message_text(
             f"🗑️ Жалобы на пользователя {target_id} сняты.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data="admin_back_to_reports")]])
+            reply_markup=ADMIN_BACK_KEYBOARD
         )
     elif action == "admin_ban_5d":
-        target_id = int(data[1])
-        ban_user_temporarily(target_id, days=5)
-        banned_until = get_banned_until(target_id)
-        dt = datetime.fromisoformat(banned_until)
+        target_id = int(arg)
+        # Бан и снятие жалоб — одна транзакция; срок бана возвращается сразу.
+        banned_until = await run_db(ban_user_temporarily, target_id, days=5, clear_reports=True)
+        if banned_until is None:
+            await query.edit_message_text("❌ Не удалось заблокировать пользователя.")
+            return
+        dt = datetime.fromtimestamp(banned_until)
         try:
             await context.bot.send_message(target_id, "⏳ Вы временно ограничены в использовании бота на 5 дней.")
-        except:
+        except Exception:
             pass
         await query.edit_message_text(
             f"⏳ Пользователь {target_id} заблокирован до {dt.strftime('%d.%m %H:%M')}.\nЖалобы сняты.",
             reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔓 Принудительно разблокировать", callback_data=f"admin_unban_{target_id}")]])
         )
-        clear_reports_for(target_id)
     elif action == "admin_unban":
-        target_id = int(data[1])
-        unban_user(target_id)
+        target_id = int(arg)
+        await run_db(unban_user, target_id)
         try:
             await context.bot.send_message(target_id, "🔓 Ваша блокировка снята.")
-        except:
+        except Exception:
             pass
         await query.edit_message_text(
             f"🔓 Пользователь {target_id} разблокирован вручную.",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data="admin_back_to_reports")]])
+            reply_markup=ADMIN_BACK_KEYBOARD
         )
     elif action == "admin_back_to_reports":
         await reports_command(update, context)
@@ -1068,23 +1769,19 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             await query.edit_message_text(
                 f"❌ Вы ещё не подписаны на {REQUIRED_CHANNEL}.\n\nПодпишитесь и нажмите кнопку ниже, чтобы проверить:",
-                reply_markup=subscribe_keyboard(),
+                reply_markup=SUBSCRIBE_KEYBOARD,
             )
     elif action == "restart_search":
         user_id = query.from_user.id
-        original_partners = context.user_data.get("original_partners", [])
-        partner_data = context.user_data.get("partner_data", {})
+        original_partners = context.user_data.get("original_partners")
         if not original_partners:
             await query.edit_message_text("❌ Нет доступных анкет для повторного просмотра.", reply_markup=get_user_keyboard(user_id))
             return
-        context.user_data["partner_queue"] = original_partners.copy()
-        first_partner_id = original_partners[0]
-        partner = partner_data.get(first_partner_id)
-        if partner:
-            await query.edit_message_text("🔄 Начинаем поиск заново...", reply_markup=None)
-            await show_partner(query.message.chat_id, context, partner)
-        else:
-            await query.edit_message_text("❌ Ошибка при повторном запуске поиска.", reply_markup=get_user_keyboard(user_id))
+        # Очередь пересобирается из сохранённых ID; удалённые анкеты
+        # next_partner пропустит сам.
+        context.user_data["partner_queue"] = deque(original_partners)
+        await query.edit_message_text("🔄 Начинаем поиск заново...", reply_markup=None)
+        await next_partner(query.message.chat_id, context, user_id)
     elif action == "main_menu":
         await query.edit_message_text("🏠 Возвращаемся в главное меню...", reply_markup=None)
         await context.bot.send_message(
@@ -1093,46 +1790,62 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_user_keyboard(query.from_user.id)
         )
 
+# Сколько жалоб помещается в одно сообщение: не больше трёх кнопок на
+# строку, а у Telegram лимит в 100 кнопок и 4096 символов.
+REPORTS_PER_MESSAGE = 20
+
 @admin_only
 async def reports_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    reports = get_reports_summary()
+    # Отвечаем по chat_id: команду вызывают и из админ-панели, где
+    # update.message нет.
+    chat_id = update.effective_chat.id
+    reports = await run_db(get_reports_summary)
     if not reports:
-        await update.message.reply_text("📭 Нет активных жалоб.", reply_markup=get_user_keyboard(update.effective_user.id))
+        await context.bot.send_message(
+            chat_id=chat_id, text="📭 Нет активных жалоб.", reply_markup=get_user_keyboard(update.effective_user.id)
+        )
         return
-    for reported_id, cnt in reports:
-        profile = get_user_profile(reported_id)
-        banned_until = get_banned_until(reported_id)
-        is_banned = banned_until is not None
+    # Анкеты всех обжалованных — одним запросом, баны — из кэша активных.
+    profiles = await run_db(get_user_profiles, [reported_id for reported_id, _ in reports])
+    blocked = await run_db(cached_blocked)
+    now = time.time()
+    # Все жалобы — одним сообщением: строка текста и ряд кнопок на каждого
+    # пользователя, в порядке числа жалоб. Отдельные карточки упирались бы
+    # в лимит Telegram на сообщения в один чат.
+    lines = ["🛑 *Жалобы*\n"]
+    kb = []
+    for n, (reported_id, cnt) in enumerate(reports[:REPORTS_PER_MESSAGE], 1):
+        profile = profiles.get(reported_id)
+        banned_until = blocked.get(reported_id)
+        is_banned = banned_until is not None and banned_until > now
         if profile:
             name, hours, age, bio, username, _, _ = profile
-            preview = f"{name}, {hours}ч, {age} лет"
-            link = f"@{username}" if username else "не указано"
+            preview = f"{escape_md(name[:32])}, {hours}ч, {age} лет"
+            link = f"@{escape_md(username)}" if username else "не указано"
         else:
             preview = "Пользователь удалён"
             link = "неизвестно"
-        status = "🚫 Заблокирован" if is_banned else "🟢 Активен"
-        time_left = ""
         if is_banned:
-            dt = datetime.fromisoformat(banned_until)
-            time_left = f"\n⏱ До разблокировки: {dt.strftime('%d.%m %H:%M')}"
-        kb = [
-            [InlineKeyboardButton(
-                "✅ Снять жалобы и разблокировать" if is_banned else "🛡️ Снять жалобы",
-                callback_data=f"admin_clear_reports_{reported_id}"
-            )],
-            [InlineKeyboardButton("⏳ Забанить на 5 дней", callback_data=f"admin_ban_5d_{reported_id}")],
+            dt = datetime.fromtimestamp(banned_until)
+            status = f"🚫 до {dt.strftime('%d.%m %H:%M')}"
+        else:
+            status = "🟢 Активен"
+        lines.append(f"{n}. {preview} (ID {reported_id}) — {link}\n    жалоб: {cnt}, {status}")
+        row = [
+            InlineKeyboardButton(f"{n}. 🛡️ Снять", callback_data=f"admin_clear_reports_{reported_id}"),
+            InlineKeyboardButton(f"{n}. ⏳ Бан 5д", callback_data=f"admin_ban_5d_{reported_id}"),
         ]
         if is_banned:
-            kb.append([InlineKeyboardButton("🔓 Принудительно разблокировать", callback_data=f"admin_unban_{reported_id}")])
-        markup = InlineKeyboardMarkup(kb)
-        await update.message.reply_text(
-            f"🛑 *Жалобы*: {cnt}\n"
-            f"👤 *Пользователь*: {preview}\n"
-            f"🔗 *Telegram*: {link}\n"
-            f"📊 *Статус*: {status}{time_left}",
-            parse_mode="Markdown",
-            reply_markup=markup,
-        )
+            row.append(InlineKeyboardButton(f"{n}. 🔓 Разбан", callback_data=f"admin_unban_{reported_id}"))
+        kb.append(row)
+    if len(reports) > REPORTS_PER_MESSAGE:
+        lines.append(f"\n…и ещё {len(reports) - REPORTS_PER_MESSAGE}: разберите эти, чтобы увидеть остальные.")
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text="\n".join(lines),
+        parse_mode="Markdown",
+        reply_markup=InlineKeyboardMarkup(kb),
+    )
 
 @admin_only
 async def block_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1142,7 +1855,7 @@ async def block_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     try:
         tg_id = int(args[0])
-        ban_user_temporarily(tg_id, days=5)
+        await run_db(ban_user_temporarily, tg_id, days=5)
         await update.message.reply_text(f"✅ Пользователь {tg_id} заблокирован на 5 дней.")
     except ValueError:
         await update.message.reply_text("⚠️ Неверный ID.")
@@ -1155,27 +1868,28 @@ async def unblock_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     try:
         tg_id = int(args[0])
-        unban_user(tg_id)
+        await run_db(unban_user, tg_id)
         await update.message.reply_text(f"✅ Пользователь {tg_id} разблокирован.")
     except ValueError:
         await update.message.reply_text("⚠️ Неверный ID.")
 
 @admin_only
 async def blocked_list_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    with Database() as cur:
-        cur.execute(
-            "SELECT user_id, banned_until FROM temp_bans WHERE banned_until > ?",
-            (datetime.now().isoformat(),)
-        )
-        rows = cur.fetchall()
+    # Как и reports_command, вызывается из админ-панели без update.message.
+    chat_id = update.effective_chat.id
+    rows = await run_db(get_blocked_list)
     if not rows:
-        await update.message.reply_text("📭 Список блокировок пуст.", reply_markup=get_user_keyboard(update.effective_user.id))
+        await context.bot.send_message(
+            chat_id=chat_id, text="📭 Список блокировок пуст.", reply_markup=get_user_keyboard(update.effective_user.id)
+        )
         return
     text = "🚫 *Заблокированные пользователи*:\n"
     for uid, banned_until in rows:
-        dt = datetime.fromisoformat(banned_until)
+        dt = datetime.fromtimestamp(banned_until)
         text += f"• {uid} (до {dt.strftime('%d.%m %H:%M')})\n"
-    await update.message.reply_text(text, parse_mode="Markdown", reply_markup=get_user_keyboard(update.effective_user.id))
+    await context.bot.send_message(
+        chat_id=chat_id, text=text, parse_mode="Markdown", reply_markup=get_user_keyboard(update.effective_user.id)
+    )
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     logger.error(f"Exception while handling an update: {context.error}")
 
@@ -1224,7 +1938,16 @@ async def setup_application():
         logger.error("❌ Не задан STEAM_API_KEY")
         return None
 
-    application = ApplicationBuilder().token(TOKEN).build()
+    # Все вебхуки делят один HTTP-клиент бота: пул соединений задаём явно,
+    # а ожидание свободного соединения ограничиваем 30 секундами вместо
+    # ошибки «All connections occupied» через секунду.
+    application = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .connection_pool_size(256)
+        .pool_timeout(30)
+        .build()
+    )
 
     # Регистрация всех обработчиков
     application.add_handler(CommandHandler("start", start))
@@ -1235,10 +1958,11 @@ async def setup_application():
     application.add_handler(CommandHandler("blocked", blocked_list_cmd))
 
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
+    application.add_handler(CallbackQueryHandler(handle_like, pattern=r"^like_\d+$"))
+    application.add_handler(CallbackQueryHandler(handle_dislike, pattern=r"^dislike_\d+$"))
+    application.add_handler(CallbackQueryHandler(handle_respond, pattern=RESPOND_PATTERN))
+    application.add_handler(CallbackQueryHandler(pagination_callback, pattern=r"^(prev|next)_\d+$"))
     application.add_handler(CallbackQueryHandler(handle_button))
-    application.add_handler(CallbackQueryHandler(handle_callback,
-                                         pattern="^(like|dislike|respond|report|activate_profile|deactivate_profile|check_subscription|restart_search|main_menu|admin_.*)"))
-    application.add_handler(CallbackQueryHandler(pagination_callback, pattern="^(prev|next)_"))
     application.add_error_handler(error_handler)
 
     # Удаляем старый вебхук и устанавливаем новый